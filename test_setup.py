@@ -9,44 +9,73 @@ import sys
 from datetime import datetime
 import json
 
-async def test_database_connection():
+from setup import load_env
+
+def import_agent():
+    """Import main.py, returning the module (passed to the tests as `pa`) or None on failure"""
+    try:
+        # main's Config reads the environment when it is imported, so load .env first
+        load_env()
+        import main as pa
+    except Exception as e:
+        sys.stdout.write("\n".join([
+            f"❌ Could not import the agent from main.py: {e}",
+            "💡 Missing dependencies? Run: pip install -r requirements.txt",
+        ]) + "\n")
+        return None
+    return pa
+
+async def create_agent(pa, with_ai=True):
+    """Create and initialize the agent shared by all tests"""
+    agent = pa.PersonalAssistantAgent()
+    if with_ai:
+        await agent.initialize()
+    else:
+        await agent.db.initialize()
+    return agent
+
+async def test_database_connection(pa, agent):
     """Test database connectivity"""
     print("🔍 Testing database connection...")
     try:
-        from main import PersonalAssistantAgent
-        agent = PersonalAssistantAgent()
-        await agent.initialize()
+        async with agent.db.pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
         print("✅ Database connection successful")
         return True
     except Exception as e:
         print(f"❌ Database connection failed: {e}")
         return False
 
-async def test_ai_client():
-    """Test AI client initialization"""
+async def test_ai_client(pa, agent=None):
+    """Test AI client initialization (uses the agent's client when given one)"""
     print("🤖 Testing AI client...")
     try:
-        from main import AIClientManager, Config
-        config = Config()
+        config = agent.config if agent else pa.Config()
         
         if not config.OPENAI_API_KEY and not config.ANTHROPIC_API_KEY:
             print("⚠️  No AI API keys configured. Please set OPENAI_API_KEY or ANTHROPIC_API_KEY in .env")
             return False
         
-        ai_client = AIClientManager(config)
-        await ai_client.initialize()
+        if agent:
+            ai_client = agent.ai
+        else:
+            ai_client = pa.AIClientManager(config)
+            await ai_client.initialize()
+        if ai_client.client is None:
+            print(f"❌ No AI client available for model {config.AI_MODEL}")
+            return False
+        if not agent:
+            await ai_client.close()
         print("✅ AI client initialized successfully")
         return True
     except Exception as e:
         print(f"❌ AI client initialization failed: {e}")
         return False
 
-async def test_transcript_processing():
+async def test_transcript_processing(pa, agent):
     """Test transcript processing with sample data"""
     print("📝 Testing transcript processing...")
     try:
-        from main import PersonalAssistantAgent, MeetingTranscript
-        
         # Sample transcript content
         sample_content = """
 Meeting: Test Meeting
@@ -58,11 +87,8 @@ John: Can you also create a summary document of our discussion?
 Sarah: Sure, I'll have that ready by Wednesday.
 """
         
-        agent = PersonalAssistantAgent()
-        await agent.initialize()
-        
         # Create sample transcript
-        transcript = MeetingTranscript(
+        transcript = pa.MeetingTranscript(
             title="Test Meeting",
             content=sample_content,
             source="test",
@@ -83,7 +109,7 @@ Sarah: Sure, I'll have that ready by Wednesday.
         print(f"❌ Transcript processing failed: {e}")
         return False
 
-async def test_file_processing():
+async def test_file_processing(pa, agent):
     """Test file-based transcript processing"""
     print("📁 Testing file processing...")
     try:
@@ -93,10 +119,6 @@ async def test_file_processing():
             print(f"⚠️  Sample file {sample_file} not found. Run setup.py first.")
             return False
         
-        from main import PersonalAssistantAgent
-        agent = PersonalAssistantAgent()
-        await agent.initialize()
-        
         action_items = await agent.process_new_transcript(
             sample_file, 
             "Sample Meeting",
@@ -109,23 +131,22 @@ async def test_file_processing():
         print(f"❌ File processing failed: {e}")
         return False
 
-async def test_task_management():
+async def test_task_management(pa, agent):
     """Test task retrieval and management"""
     print("📋 Testing task management...")
     try:
-        from main import PersonalAssistantAgent
-        agent = PersonalAssistantAgent()
-        await agent.initialize()
-        
-        # Get pending tasks
-        pending_tasks = await agent.get_pending_tasks()
-        print(f"✅ Retrieved {len(pending_tasks)} pending tasks")
-        
-        # If there are tasks, test completing one
-        if pending_tasks:
-            task_id = pending_tasks[0]['id']
-            await agent.complete_task(task_id)
-            print(f"✅ Successfully marked task {task_id} as completed")
+        # Fetch and complete on one connection, in one transaction
+        async with agent.db.pool.acquire() as conn:
+            async with conn.transaction():
+                # Get pending tasks
+                pending_tasks = await agent.get_pending_tasks(fields=["id"], conn=conn)
+                print(f"✅ Retrieved {len(pending_tasks)} pending tasks")
+                
+                # If there are tasks, test completing one
+                if pending_tasks:
+                    task_id = pending_tasks[0]['id']
+                    await agent.complete_task(task_id, conn=conn)
+                    print(f"✅ Successfully marked task {task_id} as completed")
         
         return True
     except Exception as e:
@@ -140,8 +161,11 @@ def test_environment_config():
         print("⚠️  .env file not found. Please copy .env.example to .env and configure it.")
         return False
     
-    from dotenv import load_dotenv
-    load_dotenv()
+    try:
+        load_env()
+    except ImportError:
+        print("❌ python-dotenv not installed. Run: pip install -r requirements.txt")
+        return False
     
     required_vars = [
         "DATABASE_URL",
@@ -159,13 +183,23 @@ def test_environment_config():
     print("✅ Environment configuration looks good")
     return True
 
-async def run_comprehensive_test():
+async def run_comprehensive_test(pa):
     """Run all tests"""
     print("🧪 Personal Assistant Agent - Setup Verification")
     print("=" * 50)
     
+    print("\n--- Environment Config ---")
+    results = [("Environment Config", test_environment_config())]
+    
+    # One agent (and one connection pool) shared by every test below
+    agent = None
+    try:
+        agent = await create_agent(pa)
+    except Exception as e:
+        print(f"\n❌ Agent initialization failed: {e}")
+    
+    # Task management runs last: it completes an item the processing tests created
     tests = [
-        ("Environment Config", test_environment_config),
         ("Database Connection", test_database_connection),
         ("AI Client", test_ai_client),
         ("Transcript Processing", test_transcript_processing),
@@ -173,19 +207,26 @@ async def run_comprehensive_test():
         ("Task Management", test_task_management),
     ]
     
-    results = []
-    
-    for test_name, test_func in tests:
-        print(f"\n--- {test_name} ---")
-        try:
-            if asyncio.iscoroutinefunction(test_func):
-                result = await test_func()
-            else:
-                result = test_func()
-            results.append((test_name, result))
-        except Exception as e:
-            print(f"❌ {test_name} failed with exception: {e}")
-            results.append((test_name, False))
+    try:
+        for test_name, test_func in tests:
+            print(f"\n--- {test_name} ---")
+            if agent is None:
+                # The AI client doesn't need the database, so check it on its own
+                if test_func is test_ai_client:
+                    results.append((test_name, await test_ai_client(pa)))
+                    continue
+                print(f"❌ {test_name} skipped: agent could not be initialized")
+                results.append((test_name, False))
+                continue
+            try:
+                result = await test_func(pa, agent)
+                results.append((test_name, result))
+            except Exception as e:
+                print(f"❌ {test_name} failed with exception: {e}")
+                results.append((test_name, False))
+    finally:
+        if agent is not None:
+            await agent.close()
     
     # Summary
     print("\n" + "=" * 50)
@@ -208,24 +249,41 @@ async def run_comprehensive_test():
         print("2. Set up Google Workspace integration")
         print("3. Start processing your meeting transcripts!")
     else:
-        print("\n⚠️  Some tests failed. Please check the errors above and fix the issues.")
-        print("💡 Common issues:")
-        print("   - Missing API keys in .env file")
-        print("   - Database not running or misconfigured")
-        print("   - Missing dependencies")
+        sys.stdout.write("\n".join([
+            "\n⚠️  Some tests failed. Please check the errors above and fix the issues.",
+            "💡 Common issues:",
+            "   - Missing API keys in .env file",
+            "   - Database not running or misconfigured",
+            "   - Missing dependencies",
+        ]) + "\n")
     
     return passed == len(results)
 
+async def run_with_agent(pa, *test_funcs, with_ai=True):
+    """Run the given tests against one shared agent"""
+    try:
+        agent = await create_agent(pa, with_ai)
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return
+    try:
+        for test_func in test_funcs:
+            await test_func(pa, agent)
+    finally:
+        await agent.close()
+
 def show_usage():
     """Show usage instructions"""
-    print("Personal Assistant Agent - Test Suite")
-    print("\nUsage:")
-    print("  python test_setup.py [options]")
-    print("\nOptions:")
-    print("  --db-only       Test only database connection")
-    print("  --ai-only       Test only AI client")
-    print("  --no-ai         Skip AI-related tests")
-    print("  --help, -h      Show this help message")
+    sys.stdout.write("\n".join([
+        "Personal Assistant Agent - Test Suite",
+        "\nUsage:",
+        "  python test_setup.py [options]",
+        "\nOptions:",
+        "  --db-only       Test only database connection",
+        "  --ai-only       Test only AI client",
+        "  --no-ai         Skip AI-related tests",
+        "  --help, -h      Show this help message",
+    ]) + "\n")
 
 async def main():
     """Main test function"""
@@ -233,19 +291,28 @@ async def main():
         show_usage()
         return
     
+    pa = import_agent()
+    if pa is None:
+        sys.exit(1)
+    
     if "--db-only" in sys.argv:
-        await test_database_connection()
+        await run_with_agent(pa, test_database_connection, with_ai=False)
     elif "--ai-only" in sys.argv:
-        await test_ai_client()
+        await test_ai_client(pa)
     elif "--no-ai" in sys.argv:
         # Run tests without AI components
         test_environment_config()
-        await test_database_connection()
-        await test_task_management()
+        await run_with_agent(pa, test_database_connection, test_task_management, with_ai=False)
     else:
         # Run comprehensive test
-        success = await run_comprehensive_test()
+        success = await run_comprehensive_test(pa)
         sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop is optional (not available on Windows); fall back to asyncio's loop
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
\ No newline at end of file
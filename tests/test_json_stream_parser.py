@@ -0,0 +1,69 @@
+import pytest
+
+from main import JSONArrayStreamParser
+
+
+def feed_all(text, size):
+    """Feed text to a fresh parser in pieces of `size` characters"""
+    parser = JSONArrayStreamParser()
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return parser, items
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_prose_with_brackets_before_json(size):
+    text = 'Here are the items [as JSON]:\n{"action_items": [{"a": 1}, {"b": 2}]}'
+    parser, items = feed_all(text, size)
+    assert items == [{"a": 1}, {"b": 2}]
+    assert parser.found and parser.complete
+
+
+@pytest.mark.parametrize("size", [1, 1000])
+def test_other_array_key_before_action_items(size):
+    text = '{"notes": ["x", {"y": 1}], "action_items": [{"a": 1}]}'
+    parser, items = feed_all(text, size)
+    assert items == [{"a": 1}]
+    assert parser.complete
+
+
+@pytest.mark.parametrize("size", [1, 1000])
+def test_escaped_quotes_and_braces_in_strings(size):
+    text = r'{"action_items": [{"a": "say \"hi\" }]{[", "b": "\\"}, {"c": "]"}]}'
+    parser, items = feed_all(text, size)
+    assert items == [{"a": 'say "hi" }]{[', "b": "\\"}, {"c": "]"}]
+    assert parser.complete
+
+
+def test_items_returned_as_soon_as_they_close():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('{"action_items": [{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}]}') == [{"b": 2}]
+    assert parser.complete
+
+
+def test_nested_values_stay_in_their_item():
+    text = '{"action_items": [{"a": {"b": [1, {"c": 2}]}}]}'
+    parser, items = feed_all(text, 1)
+    assert items == [{"a": {"b": [1, {"c": 2}]}}]
+
+
+def test_missing_array():
+    parser, items = feed_all('Sorry, I found no action items.', 1)
+    assert items == []
+    assert not parser.found
+    assert not parser.complete
+
+
+def test_unclosed_array():
+    parser, items = feed_all('{"action_items": [{"a": 1}, {"b": 2', 4)
+    assert items == [{"a": 1}]
+    assert parser.found
+    assert not parser.complete
+
+
+def test_empty_array():
+    parser, items = feed_all('```json\n{"action_items": []}\n```', 1)
+    assert items == []
+    assert parser.found and parser.complete